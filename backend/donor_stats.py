@@ -0,0 +1,228 @@
+# donor_stats.py
+from datetime import datetime, timedelta
+from firebase_admin import db
+import firebase_config  # Firebase setup file
+import donor_store
+import predictor
+
+# Precomputed per-hospital aggregates, stored at donor_stats/{hospital_id}:
+# {
+#   "donors_total": int,
+#   "frequency_distribution": {frequence: count},
+#   "last_donation_dates": {"YYYY-MM-DD" | "none": count},
+#   "propensity_sum": float,
+#   "propensity_count": int,
+#   "propensity_updated_at": "YYYY-MM-DD HH:MM:SS",
+#   "updated_at": "YYYY-MM-DD HH:MM:SS"
+# }
+# Counts are kept per last donation day rather than as a single "eligible" counter,
+# because donors become eligible again as time passes without any write happening.
+#
+# The propensity fields are only computed by reconcile_all, with recency measured
+# at reconcile time: the mean propensity reflects the last reconcile, not the
+# moment of the last write. Donor writes update the counters only.
+#
+# Writes never scan donors: a hospital without a node starts from empty counters.
+# reconcile_stats.py must therefore be run once after deploying to seed the stats
+# of hospitals that already have donors.
+STATS_PATH = "donor_stats"
+
+# Minimum delay between two donations (same rule as check_and_update_frequency)
+DONATION_INTERVAL = timedelta(days=3 * 30)  # Approximation
+
+NO_DATE = "none"
+
+
+def _empty_stats():
+    return {
+        "donors_total": 0,
+        "frequency_distribution": {},
+        "last_donation_dates": {},
+        "propensity_sum": 0.0,
+        "propensity_count": 0,
+    }
+
+
+def _normalize(stats):
+    # Firebase returns nodes with integer-like keys ("1", "2", ...) as lists
+    distribution = stats.get("frequency_distribution") or {}
+    if isinstance(distribution, list):
+        distribution = {str(i): count for i, count in enumerate(distribution) if count is not None}
+    stats["frequency_distribution"] = distribution
+    stats["last_donation_dates"] = stats.get("last_donation_dates") or {}
+    return stats
+
+
+def _date_key(donor):
+    # Re-formatted so dates without leading zeros ("2026-7-1") still compare correctly as text
+    try:
+        parsed = datetime.strptime(donor.get("last_donation_date"), "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return NO_DATE
+    return parsed.strftime("%Y-%m-%d")
+
+
+def _frequency_key(donor):
+    # Whole number as string: Firebase keys can't contain "." (e.g. 2.5)
+    try:
+        return str(int(float(donor.get("frequence", 0))))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _bump(counts, key, delta):
+    # Counters never go below zero; empty buckets are dropped
+    counts[key] = max(counts.get(key, 0) + delta, 0)
+    if not counts[key]:
+        del counts[key]
+
+
+def _apply(stats, donor, sign):
+    """Add (sign=1) or remove (sign=-1) one donor's contribution to the aggregates."""
+    stats["donors_total"] = max(stats.get("donors_total", 0) + sign, 0)
+    frequency_key = _frequency_key(donor)
+    if frequency_key is not None:
+        _bump(stats["frequency_distribution"], frequency_key, sign)
+    _bump(stats["last_donation_dates"], _date_key(donor), sign)
+
+
+def build_stats(donors):
+    """Aggregate an iterable of donor records from scratch (counters only)."""
+    stats = _empty_stats()
+    for donor in donors:
+        _apply(stats, donor, 1)
+    return stats
+
+
+def propensity_stats(donors, now):
+    """Sum and count of the donors' predicted propensities, with recency measured at `now`."""
+    propensities = [p for p in predictor.predict_propensities(donors, now) if p is not None]
+    return {
+        "propensity_sum": sum(propensities),
+        "propensity_count": len(propensities),
+        "propensity_updated_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def record_donor_change(hospital_id, old_donor=None, new_donor=None):
+    """
+    Incrementally update a hospital's aggregates after a donor write.
+
+    If the hospital has no aggregates yet, the delta is applied to empty ones;
+    existing donors are only counted once reconcile_stats.py has seeded them.
+
+    Args:
+        hospital_id (str): Hospital the donor belongs to.
+        old_donor (dict): Donor record before the write (None on creation).
+        new_donor (dict): Donor record after the write (None on deletion).
+    """
+    def update(current):
+        stats = _normalize(current or _empty_stats())
+        if old_donor:
+            _apply(stats, old_donor, -1)
+        if new_donor:
+            _apply(stats, new_donor, 1)
+        stats["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return stats
+
+    # Transaction so concurrent writes (or workers) don't lose increments
+    db.reference(STATS_PATH).child(donor_store.shard_key(hospital_id)).transaction(update)
+
+
+def get_hospital_stats(hospital_id, now=None):
+    """
+    Build the stats payload for a hospital from its precomputed aggregates.
+
+    Returns:
+        dict: Donor totals, eligible-now count, frequency distribution and mean propensity.
+    """
+    stats = _normalize(db.reference(STATS_PATH).child(donor_store.shard_key(hospital_id)).get() or _empty_stats())
+
+    cutoff = ((now or datetime.now()) - DONATION_INTERVAL).strftime("%Y-%m-%d")
+    eligible_now = sum(
+        count
+        for date_str, count in stats["last_donation_dates"].items()
+        if date_str != NO_DATE and date_str <= cutoff
+    )
+
+    propensity_count = stats.get("propensity_count", 0)
+    mean_propensity = stats.get("propensity_sum", 0.0) / propensity_count if propensity_count else None
+
+    return {
+        "hospital_id": hospital_id,
+        "donors_total": stats.get("donors_total", 0),
+        "eligible_now": eligible_now,
+        "frequency_distribution": stats["frequency_distribution"],
+        "mean_propensity": mean_propensity,
+        "propensity_updated_at": stats.get("propensity_updated_at"),
+        "updated_at": stats.get("updated_at"),
+    }
+
+
+class _StatsChanged(Exception):
+    """Raised to abort a reconcile write when the stats were created meanwhile."""
+
+
+def _set_if_missing(stats):
+    def update(current):
+        if current is not None:
+            raise _StatsChanged()
+        return stats
+    return update
+
+
+def reconcile_all(now=None):
+    """
+    Rebuild every hospital's aggregates with a full scan of the donors.
+
+    Each hospital is written with a compare-and-set against the etag read before
+    the scan: if an incremental update landed meanwhile, that hospital's counters
+    are skipped (they are already being kept in sync) and picked up by the next run.
+
+    Propensities are recomputed for every donor with recency measured at `now`.
+    Donor writes never touch the propensity fields, so they are written even for
+    skipped hospitals.
+
+    Returns:
+        tuple: (hospitals reconciled, hospitals skipped because they changed during the scan).
+    """
+    now = now or datetime.now()
+    stats_ref = db.reference(STATS_PATH)
+
+    # Etags must be read before the scan so concurrent writes are detected
+    etags = {
+        hospital_id: stats_ref.child(hospital_id).get(etag=True)[1]
+        for hospital_id in (stats_ref.get(shallow=True) or {})
+    }
+
+    donors_by_hospital = {hospital_id: [] for hospital_id in etags}
+    for hospital_id, donor_id, donor in donor_store.iter_all_donors():
+        # Legacy flat records may carry a hospital_id that can't be a key
+        if hospital_id and not donor_store.is_valid_key(hospital_id):
+            continue
+        donors_by_hospital.setdefault(donor_store.shard_key(hospital_id), []).append(donor)
+
+    updated_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    reconciled, skipped = 0, 0
+    for hospital_id, donors in donors_by_hospital.items():
+        propensities = propensity_stats(donors, now)
+        stats = {**build_stats(donors), **propensities}
+        stats["updated_at"] = updated_at
+
+        hospital_ref = stats_ref.child(hospital_id)
+        if hospital_id in etags:
+            written, _, _ = hospital_ref.set_if_unchanged(etags[hospital_id], stats)
+        else:
+            try:
+                hospital_ref.transaction(_set_if_missing(stats))
+                written = True
+            except _StatsChanged:
+                written = False
+
+        if written:
+            reconciled += 1
+        else:
+            hospital_ref.update(propensities)
+            skipped += 1
+
+    return reconciled, skipped
@@ -0,0 +1,190 @@
+# donor_store.py
+import os
+import uuid
+from firebase_admin import db
+import firebase_config  # Firebase setup file
+
+# Donor data layout:
+# - "flat"    → donors/{donor_id}                 (legacy, one node for every hospital)
+# - "sharded" → donors/{hospital_id}/{donor_id}   (one shard per hospital)
+# In sharded mode, donor_locations/{donor_id} maps each donor back to its hospital
+# so endpoints that only receive a donor ID don't have to scan every shard, and
+# donor_cins/{cin} → {hospital_id, donor_id} keeps CINs unique across all hospitals.
+DONORS_PATH = "donors"
+DONOR_LOCATIONS_PATH = "donor_locations"
+DONOR_CINS_PATH = "donor_cins"
+DONOR_LAYOUT = os.getenv("DONOR_LAYOUT", "flat").lower()
+
+# Shard used for donors posted without a hospital_id
+UNASSIGNED_HOSPITAL = "_unassigned"
+
+# Characters Firebase doesn't allow in keys ("/" would nest the path instead)
+INVALID_KEY_CHARS = set(".#$[]/")
+
+
+def is_sharded():
+    return DONOR_LAYOUT == "sharded"
+
+
+def is_valid_key(value):
+    """True if `value` can be used as a single Firebase key (CINs, hospital IDs)."""
+    value = str(value)
+    return bool(value) and not INVALID_KEY_CHARS & set(value)
+
+
+def shard_key(hospital_id):
+    """
+    Return the shard name for a hospital ID (falls back to the unassigned shard).
+
+    Raises:
+        ValueError: If the hospital ID can't be used as a single Firebase key.
+    """
+    if not hospital_id:
+        return UNASSIGNED_HOSPITAL
+    if not is_valid_key(hospital_id):
+        raise ValueError(f"Invalid hospital_id: {hospital_id!r}")
+    return str(hospital_id)
+
+
+def donors_ref(hospital_id=None):
+    """
+    Reference to the node that holds donors for a hospital.
+
+    In flat mode this is always the shared `donors` node.
+    """
+    if is_sharded():
+        return db.reference(f"{DONORS_PATH}/{shard_key(hospital_id)}")
+    return db.reference(DONORS_PATH)
+
+
+def get_hospital_donors(hospital_id):
+    """
+    Return {donor_id: donor} for one hospital.
+
+    Sharded mode reads only that hospital's shard; flat mode filters the full list.
+    """
+    if is_sharded():
+        return donors_ref(hospital_id).get() or {}
+
+    donors = db.reference(DONORS_PATH).get() or {}
+    return {
+        donor_id: donor
+        for donor_id, donor in donors.items()
+        if donor.get("hospital_id") == hospital_id
+    }
+
+
+def iter_hospital_donor_pages(hospital_id, page_size=500):
+    """
+    Yield one hospital's donors as pages: lists of (donor_id, donor).
+
+    Sharded mode pages through the hospital's shard by key so only `page_size`
+    donors are held in memory; flat mode has to read the full list once.
+    """
+    if not is_sharded():
+        donors = list(get_hospital_donors(hospital_id).items())
+        for start in range(0, len(donors), page_size):
+            yield donors[start:start + page_size]
+        return
+
+    ref = donors_ref(hospital_id)
+    last_key = None
+    while True:
+        query = ref.order_by_key()
+        limit = page_size
+        if last_key is not None:
+            query = query.start_at(last_key)
+            limit += 1
+        page = query.limit_to_first(limit).get() or {}
+
+        # start_at is inclusive: skip the last donor of the previous page
+        items = [(key, donor) for key, donor in page.items() if key != last_key]
+        if not items:
+            return
+        yield items
+        last_key = items[-1][0]
+
+
+def iter_all_donors():
+    """Yield (hospital_id, donor_id, donor) for every donor, whatever the layout."""
+    donors = db.reference(DONORS_PATH).get() or {}
+    if is_sharded():
+        for hospital_id, shard in donors.items():
+            for donor_id, donor in (shard or {}).items():
+                # Skip anything that isn't a donor record (e.g. data nested by a bad path)
+                if isinstance(donor, dict):
+                    yield hospital_id, donor_id, donor
+    else:
+        for donor_id, donor in donors.items():
+            yield donor.get("hospital_id"), donor_id, donor
+
+
+def find_donor_by_cin(cin):
+    """
+    Find a donor by CIN, across all hospitals.
+
+    Sharded mode resolves the CIN through the donor_cins index instead of scanning shards.
+
+    Returns:
+        tuple: (hospital_id, donor_id, donor) or (None, None, None) if not found.
+    """
+    if is_sharded():
+        location = db.reference(DONOR_CINS_PATH).child(str(cin)).get() if is_valid_key(cin) else None
+        if location:
+            donor = donors_ref(location["hospital_id"]).child(location["donor_id"]).get()
+            if donor:
+                return location["hospital_id"], location["donor_id"], donor
+        return None, None, None
+
+    for donor_hospital_id, donor_id, donor in iter_all_donors():
+        if donor.get("cin") == cin:
+            return donor_hospital_id, donor_id, donor
+    return None, None, None
+
+
+def donor_ref(donor_id):
+    """
+    Reference to a single donor record, or None if its shard is unknown.
+    """
+    if not is_sharded():
+        return db.reference(DONORS_PATH).child(donor_id)
+
+    hospital_id = db.reference(DONOR_LOCATIONS_PATH).child(donor_id).get()
+    if hospital_id is None:
+        return None
+    return donors_ref(hospital_id).child(donor_id)
+
+
+def index_updates(donor_id, hospital_id, cin=None):
+    """Multi-path updates that register a donor in donor_locations and donor_cins."""
+    updates = {f"{DONOR_LOCATIONS_PATH}/{donor_id}": shard_key(hospital_id)}
+    if cin:
+        updates[f"{DONOR_CINS_PATH}/{str(cin)}"] = {"hospital_id": shard_key(hospital_id), "donor_id": donor_id}
+    return updates
+
+
+def insert_donor(donor, donor_id=None):
+    """
+    Write a new donor record and return its ID.
+
+    In sharded mode the record, its donor_locations entry and its donor_cins entry
+    are written in a single multi-path update, so a donor is never left unindexed.
+    The ID is generated locally there, since push() would write the record first.
+
+    Args:
+        donor (dict): Donor record (its `cin` and `hospital_id` must be valid keys).
+        donor_id (str): ID to use; a new one is generated if omitted.
+    """
+    hospital_id = donor.get("hospital_id")
+    if not is_sharded():
+        if donor_id is None:
+            return db.reference(DONORS_PATH).push(donor).key
+        db.reference(DONORS_PATH).child(donor_id).set(donor)
+        return donor_id
+
+    donor_id = donor_id or uuid.uuid4().hex
+    db.reference("/").update({
+        f"{DONORS_PATH}/{shard_key(hospital_id)}/{donor_id}": donor,
+        **index_updates(donor_id, hospital_id, donor.get("cin")),
+    })
+    return donor_id
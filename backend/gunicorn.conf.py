@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Multi-worker server mode: gunicorn manages several uvicorn workers.
+# With preload_app the app (XGBoost model, scaler, chatbot model) is imported once
+# in the master process and forked workers share those pages copy-on-write
+# instead of each loading its own copy.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    # Move the preloaded objects out of the GC's tracked generations so that
+    # garbage collection in the workers doesn't touch (and copy) shared pages.
+    gc.freeze()
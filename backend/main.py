@@ -1,8 +1,9 @@
 import os
-from fastapi import FastAPI, HTTPException
-import joblib
+from fastapi import FastAPI, HTTPException, Request
+from brotli_asgi import BrotliMiddleware
 from pydantic import BaseModel
 from typing import List
+from itertools import chain
 import numpy as np
 import pickle as pkl
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,16 +13,15 @@ sys.path.append(os.path.abspath('.'))  # Workaround for module path issues
 import auth  # Authentication (Firebase-based)
 import chatboot
 import notif
-# Load XGBoost model and scaler
-try:
-    model = joblib.load("./data/xgboost_model_tuned.pkl")
-    scaler = joblib.load("./data/scaler.pkl")
-    print("Model and scaler loaded successfully!")
-except Exception as e:
-    print(f"Error loading model & scaler: {e}")
-    raise
+import predictor  # Loads the XGBoost model and scaler
+from streaming import ndjson_response, wants_ndjson
+
+# Rows sent to the model at once when streaming predictions
+PREDICT_CHUNK_SIZE = 1000
 
 # FastAPI app initialization
+# Routes declare a response_model so FastAPI serializes them to JSON bytes with Pydantic
+# (much faster than the default jsonable_encoder + json.dumps path)
 app = FastAPI(title="XGBoost Batch Prediction API")
 app.include_router(user_router)  # Include user-related routes
 app.include_router(auth.router)  # Include authentication routes
@@ -34,6 +34,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Negotiated compression: brotli when the client accepts it, gzip otherwise
+app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
 
 # Pydantic model for input sample
 class Sample(BaseModel):
@@ -45,12 +47,43 @@ class Sample(BaseModel):
 class BatchInput(BaseModel):
     samples: List[Sample]
 
+# Pydantic model for batch output
+class BatchOutput(BaseModel):
+    predictions: List[int]
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
-@app.post("/predict")
-def predict(input_batch: BatchInput):
+def prediction_chunks(samples):
+    # Predict chunk by chunk so large batches are sent as soon as each chunk is ready
+    for start in range(0, len(samples), PREDICT_CHUNK_SIZE):
+        data = np.array([
+            [sample.recency, sample.frequency, sample.time]
+            for sample in samples[start:start + PREDICT_CHUNK_SIZE]
+        ])
+        yield predictor.predict(data).tolist()
+
+@app.post("/predict", response_model=BatchOutput)
+def predict(input_batch: BatchInput, request: Request):
+    if not input_batch.samples:
+        raise HTTPException(status_code=400, detail="No samples provided.")
+
+    # With "Accept: application/x-ndjson", stream one prediction per line
+    if wants_ndjson(request):
+        chunks = prediction_chunks(input_batch.samples)
+        try:
+            # Compute the first chunk before the 200 headers are sent, so invalid
+            # input or model errors still return a 400 like the JSON path
+            first_chunk = next(chunks)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # One NDJSON block per model chunk
+        return ndjson_response(
+            [{"prediction": prediction} for prediction in chunk]
+            for chunk in chain([first_chunk], chunks)
+        )
+
     try:
         # Convert input samples into a 2D numpy array
         data = np.array([
@@ -58,11 +91,8 @@ def predict(input_batch: BatchInput):
             for sample in input_batch.samples
         ])
         
-        # Scale data before making predictions
-        scaled_data = scaler.transform(data)
-        
-        # Make predictions with the XGBoost model
-        predictions = model.predict(scaled_data)
+        # Scale data and make predictions with the XGBoost model
+        predictions = predictor.predict(data)
         
         # Return predictions
         return {"predictions": predictions.tolist()}
@@ -0,0 +1,70 @@
+"""
+Migrate donors from the flat layout (donors/{donor_id}) to the hospital-sharded
+layout (donors/{hospital_id}/{donor_id}).
+
+Each batch is written with a single multi-path update, so a donor is moved,
+removed from the flat node and registered in donor_locations / donor_cins atomically.
+The script can be re-run safely: entries that are already shards are skipped.
+
+Usage:
+    python migrate_donors.py [--dry-run] [--batch-size 500]
+
+Once done, start the API with DONOR_LAYOUT=sharded.
+"""
+import argparse
+from firebase_admin import db
+import firebase_config  # Firebase setup file
+from donor_store import DONORS_PATH, index_updates, is_valid_key, shard_key
+
+
+def is_flat_donor(entry):
+    # A shard only contains donor records (dicts); a flat donor has scalar fields (cin, name...)
+    return isinstance(entry, dict) and any(not isinstance(v, dict) for v in entry.values())
+
+
+def build_updates(donors):
+    """Return the multi-path updates needed to move every flat donor into its shard."""
+    updates = []
+    for donor_id, donor in donors.items():
+        if not is_flat_donor(donor):
+            continue
+        if donor.get("hospital_id") and not is_valid_key(donor["hospital_id"]):
+            print(f"Skipping donor {donor_id}: hospital_id {donor['hospital_id']!r} can't be a shard key")
+            continue
+        if donor.get("cin") and not is_valid_key(donor["cin"]):
+            print(f"Skipping donor {donor_id}: CIN {donor['cin']!r} can't be indexed")
+            continue
+        hospital_id = shard_key(donor.get("hospital_id"))
+        updates.append({
+            f"{DONORS_PATH}/{hospital_id}/{donor_id}": donor,
+            f"{DONORS_PATH}/{donor_id}": None,
+            **index_updates(donor_id, hospital_id, donor.get("cin")),
+        })
+    return updates
+
+
+def migrate(batch_size=500, dry_run=False):
+    donors = db.reference(DONORS_PATH).get() or {}
+    updates = build_updates(donors)
+    print(f"{len(updates)} flat donors to migrate ({len(donors) - len(updates)} entries already sharded).")
+
+    if dry_run:
+        return len(updates)
+
+    root = db.reference("/")
+    for start in range(0, len(updates), batch_size):
+        batch = {}
+        for update in updates[start:start + batch_size]:
+            batch.update(update)
+        root.update(batch)
+        print(f"Migrated {min(start + batch_size, len(updates))}/{len(updates)} donors")
+
+    return len(updates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard donors by hospital_id.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Donors moved per atomic update")
+    parser.add_argument("--dry-run", action="store_true", help="Only count donors to migrate")
+    args = parser.parse_args()
+    migrate(batch_size=args.batch_size, dry_run=args.dry_run)
@@ -0,0 +1,57 @@
+# predictor.py
+import math
+import joblib
+import numpy as np
+from datetime import datetime
+
+# Load XGBoost model and scaler
+try:
+    model = joblib.load("./data/xgboost_model_tuned.pkl")
+    scaler = joblib.load("./data/scaler.pkl")
+    print("Model and scaler loaded successfully!")
+except Exception as e:
+    print(f"Error loading model & scaler: {e}")
+    raise
+
+
+def predict(data):
+    """Scale a (n, 3) array of [recency, frequency, time] rows and return class predictions."""
+    return model.predict(scaler.transform(data))
+
+
+def donor_features(donor, now=None):
+    """
+    Build the model input [recency, frequency, time] for a donor record.
+
+    recency and time are expressed in months since the last / first donation.
+
+    Returns:
+        list or None: Features, or None if the donor has no valid donation dates or frequence.
+    """
+    now = now or datetime.now()
+    try:
+        last = datetime.strptime(donor["last_donation_date"], "%Y-%m-%d")
+        first = datetime.strptime(donor.get("first_donation_date") or donor["last_donation_date"], "%Y-%m-%d")
+        # Donor payloads are free-form dicts: frequence may arrive as a string
+        frequency = float(donor.get("frequence", 0))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not math.isfinite(frequency):
+        return None
+    return [(now - last).days / 30, frequency, (now - first).days / 30]
+
+
+def predict_propensities(donors, now=None):
+    """
+    Probability that each donor will donate again, in a single model call.
+
+    Returns:
+        list: One probability per donor, or None where it can't be computed.
+    """
+    features = [donor_features(donor, now) for donor in donors]
+    rows = [row for row in features if row is not None]
+    if not rows:
+        return [None] * len(features)
+
+    probabilities = iter(model.predict_proba(scaler.transform(np.array(rows)))[:, 1].tolist())
+    return [next(probabilities) if row is not None else None for row in features]
@@ -0,0 +1,41 @@
+"""
+Full reconciliation of the per-hospital donor analytics (donor_stats).
+
+The aggregates are updated incrementally on every donor write; this job rebuilds
+them from a full scan to fix any drift (failed writes, manual edits in the
+console). Hospitals updated while the scan runs are skipped and picked up by
+the next run.
+
+It is also the only job that computes predicted propensities (recency measured
+at run time), so the mean_propensity served by /donations/stats reflects the
+last run, not the moment of the last donor write.
+
+Required deploy step: run it once after deploying the stats feature (and after
+migrate_donors.py), otherwise /donations/stats reports zeros for hospitals
+that haven't had a donor write since.
+
+Usage:
+    python reconcile_stats.py                  # run once (e.g. from a cron / scheduled machine)
+    python reconcile_stats.py --interval 3600  # run every hour
+"""
+import argparse
+import time
+import donor_stats
+
+
+def run_once():
+    started = time.time()
+    reconciled, skipped = donor_stats.reconcile_all()
+    print(f"Reconciled donor stats for {reconciled} hospitals ({skipped} changed during the scan, skipped) "
+          f"in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-hospital donor analytics.")
+    parser.add_argument("--interval", type=int, default=0, help="Seconds between runs (0 = run once)")
+    args = parser.parse_args()
+
+    run_once()
+    while args.interval > 0:
+        time.sleep(args.interval)
+        run_once()
@@ -0,0 +1,28 @@
+# streaming.py
+import orjson
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Clients opt in to streaming with "Accept: application/x-ndjson":
+# one JSON document per line, sent as soon as it is ready.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request):
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(batches):
+    """
+    Stream an iterable of batches (lists of JSON-serializable items) as NDJSON.
+
+    Each batch is sent as one block: a message per row would make the compression
+    middleware flush its stream on every line and lose most of the compression.
+    Sync iterables are consumed in a threadpool by Starlette, so blocking
+    Firebase / model calls inside them don't block the event loop.
+    """
+    blocks = (
+        b"".join(orjson.dumps(item) + b"\n" for item in batch)
+        for batch in batches
+    )
+    return StreamingResponse(blocks, media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,138 @@
+import copy
+import json
+import os
+import sys
+import types
+
+import pytest
+
+# Run the backend modules from their own directory (imports and ./data paths are relative to it)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+# firebase_config initializes the Firebase app from credentials.json, which tests don't have;
+# every test replaces `db` with an in-memory fake instead.
+sys.modules.setdefault("firebase_config", types.ModuleType("firebase_config"))
+
+
+class FakeRef:
+    """In-memory stand-in for firebase_admin.db.Reference (paths, get/set/update, transactions)."""
+
+    def __init__(self, root, path):
+        self.root = root
+        self.parts = [part for part in path.strip("/").split("/") if part]
+
+    @property
+    def key(self):
+        return self.parts[-1] if self.parts else None
+
+    def child(self, path):
+        return FakeRef(self.root, "/".join(self.parts + [str(path)]))
+
+    def _value(self):
+        node = self.root.data
+        for part in self.parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def get(self, etag=False, shallow=False):
+        value = copy.deepcopy(self._value())
+        if shallow and isinstance(value, dict):
+            value = {key: True for key in value}
+        if etag:
+            return value, self._etag()
+        return value
+
+    def _etag(self):
+        return json.dumps(self._value(), sort_keys=True)
+
+    def set(self, value):
+        if not self.parts:
+            self.root.data = copy.deepcopy(value) or {}
+            return
+        node = self.root.data
+        for part in self.parts[:-1]:
+            node = node.setdefault(part, {})
+        if value is None:
+            node.pop(self.parts[-1], None)
+        else:
+            node[self.parts[-1]] = copy.deepcopy(value)
+
+    def update(self, values):
+        # Multi-path update: keys may be nested paths relative to this reference
+        for path, value in values.items():
+            self.child(path).set(value)
+
+    def push(self, value=""):
+        self.root.push_count += 1
+        ref = self.child(f"push{self.root.push_count}")
+        ref.set(value)
+        return ref
+
+    def order_by_key(self):
+        return FakeKeyQuery(self)
+
+    def set_if_unchanged(self, expected_etag, value):
+        if self._etag() != expected_etag:
+            return False, self.get(), self._etag()
+        self.set(value)
+        return True, value, self._etag()
+
+    def transaction(self, update):
+        new_value = update(self.get())
+        self.set(new_value)
+        return new_value
+
+
+class FakeKeyQuery:
+    """order_by_key() query with start_at / limit_to_first."""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.start = None
+        self.limit = None
+
+    def start_at(self, key):
+        self.start = key
+        return self
+
+    def limit_to_first(self, limit):
+        self.limit = limit
+        return self
+
+    def get(self):
+        data = self.ref.get() or {}
+        keys = sorted(key for key in data if self.start is None or key >= self.start)
+        return {key: data[key] for key in keys[:self.limit]}
+
+
+class FakeDb:
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.push_count = 0
+
+    def reference(self, path="/"):
+        return FakeRef(self, path)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Replace Firebase in every backend module that talks to it."""
+    import donor_stats
+    import donor_store
+    import userApi
+
+    fake = FakeDb()
+    for module in (donor_store, donor_stats, userApi):
+        monkeypatch.setattr(module, "db", fake)
+    return fake
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    import donor_store
+
+    monkeypatch.setattr(donor_store, "DONOR_LAYOUT", "sharded")
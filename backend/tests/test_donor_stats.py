@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import donor_stats
+from donor_stats import _apply, _empty_stats, _normalize, build_stats
+
+
+DONOR = {"frequence": 2, "last_donation_date": "2026-01-15"}
+
+
+def test_apply_then_remove_is_symmetric():
+    stats = _empty_stats()
+    _apply(stats, DONOR, 1)
+    assert stats["donors_total"] == 1
+    assert stats["frequency_distribution"] == {"2": 1}
+    assert stats["last_donation_dates"] == {"2026-01-15": 1}
+
+    _apply(stats, DONOR, -1)
+    assert stats == _empty_stats()
+
+
+def test_removing_unknown_donor_never_goes_negative():
+    stats = _empty_stats()
+    _apply(stats, DONOR, -1)
+    assert stats == _empty_stats()
+
+
+def test_frequency_is_bucketed_as_whole_number():
+    stats = build_stats([{"frequence": 2.5}, {"frequence": "3"}, {"frequence": "abc"}])
+    assert stats["donors_total"] == 3
+    assert stats["frequency_distribution"] == {"2": 1, "3": 1}
+    assert stats["last_donation_dates"] == {donor_stats.NO_DATE: 3}
+
+
+def test_normalize_converts_firebase_arrays():
+    stats = _normalize({"frequency_distribution": [None, 4, None, 1]})
+    assert stats["frequency_distribution"] == {"1": 4, "3": 1}
+    assert stats["last_donation_dates"] == {}
+
+
+def test_eligibility_cutoff_is_inclusive_at_90_days(fake_db):
+    now = datetime(2026, 6, 1)
+    cutoff = now - timedelta(days=90)
+    dates = {
+        cutoff.strftime("%Y-%m-%d"): 2,
+        (cutoff + timedelta(days=1)).strftime("%Y-%m-%d"): 5,
+        donor_stats.NO_DATE: 3,
+    }
+    fake_db.data = {"donor_stats": {"h1": {
+        "donors_total": 10, "last_donation_dates": dates, "frequency_distribution": [None, 10],
+    }}}
+
+    stats = donor_stats.get_hospital_stats("h1", now=now)
+
+    assert stats["eligible_now"] == 2
+    assert stats["frequency_distribution"] == {"1": 10}
+    assert stats["mean_propensity"] is None
+
+
+def test_first_write_starts_from_empty_stats_without_scanning(fake_db, monkeypatch):
+    def no_scan(hospital_id):
+        raise AssertionError("the write path must not scan donors")
+    monkeypatch.setattr(donor_stats.donor_store, "get_hospital_donors", no_scan)
+
+    # Removing a donor the empty stats never counted must not go negative
+    donor_stats.record_donor_change("h1", old_donor=DONOR, new_donor=dict(DONOR, frequence=3))
+
+    stats = fake_db.data["donor_stats"]["h1"]
+    assert stats["donors_total"] == 1
+    assert stats["frequency_distribution"] == {"3": 1}
+
+
+def test_update_applies_delta_to_existing_stats(fake_db):
+    fake_db.data = {"donor_stats": {"h1": {**build_stats([DONOR]), "propensity_sum": 0.4, "propensity_count": 1}}}
+
+    updated = dict(DONOR, frequence=3, last_donation_date="2026-05-01")
+    donor_stats.record_donor_change("h1", old_donor=DONOR, new_donor=updated)
+
+    stats = fake_db.data["donor_stats"]["h1"]
+    assert stats["donors_total"] == 1
+    assert stats["frequency_distribution"] == {"3": 1}
+    assert stats["last_donation_dates"] == {"2026-05-01": 1}
+    # Propensity is only refreshed by reconcile_all
+    assert stats["propensity_sum"] == 0.4
+    assert stats["propensity_count"] == 1
+
+
+def test_dates_without_leading_zeros_are_normalized():
+    stats = build_stats([{"last_donation_date": "2026-7-1"}])
+
+    assert stats["last_donation_dates"] == {"2026-07-01": 1}
+
+
+# ------------------------- Reconciliation -------------------------
+
+
+NOW = datetime(2026, 6, 1)
+LEGACY_DONORS = {
+    "d1": {"hospital_id": "h1", "frequence": 1, "last_donation_date": "2026-01-10"},
+    "d2": {"hospital_id": "h1", "frequence": 4, "first_donation_date": "2024-02-01", "last_donation_date": "2026-05-20"},
+    "d3": {"hospital_id": "h2", "frequence": 2},
+}
+
+
+def test_reconcile_seeds_counters_and_propensity(fake_db):
+    fake_db.data = {"donors": LEGACY_DONORS}
+
+    assert donor_stats.reconcile_all(now=NOW) == (2, 0)
+
+    h1 = donor_stats.get_hospital_stats("h1", now=NOW)
+    assert h1["donors_total"] == 2
+    assert h1["eligible_now"] == 1
+    assert h1["frequency_distribution"] == {"1": 1, "4": 1}
+    assert 0 <= h1["mean_propensity"] <= 1
+    assert h1["propensity_updated_at"] == "2026-06-01 00:00:00"
+
+    # d3 has no donation date, so no propensity can be predicted for it
+    h2 = donor_stats.get_hospital_stats("h2", now=NOW)
+    assert h2["donors_total"] == 1
+    assert h2["mean_propensity"] is None
+
+
+def test_reconcile_skips_counters_changed_during_scan(fake_db, monkeypatch):
+    fake_db.data = {"donors": LEGACY_DONORS, "donor_stats": {"h1": {"donors_total": 7}}}
+    scan = donor_stats.donor_store.iter_all_donors
+
+    def scan_with_concurrent_write():
+        # An incremental update lands after the etags were read
+        fake_db.reference("donor_stats/h1/donors_total").set(8)
+        yield from scan()
+    monkeypatch.setattr(donor_stats.donor_store, "iter_all_donors", scan_with_concurrent_write)
+
+    assert donor_stats.reconcile_all(now=NOW) == (1, 1)
+
+    h1 = fake_db.data["donor_stats"]["h1"]
+    assert h1["donors_total"] == 8
+    # Propensities are never written incrementally, so they are refreshed anyway
+    assert h1["propensity_count"] == 2
+
+
+def test_reconcile_skips_hospital_created_during_scan(fake_db, monkeypatch):
+    fake_db.data = {"donors": LEGACY_DONORS}
+    scan = donor_stats.donor_store.iter_all_donors
+
+    def scan_with_concurrent_write():
+        yield from scan()
+        donor_stats.record_donor_change("h2", new_donor={"frequence": 5})
+    monkeypatch.setattr(donor_stats.donor_store, "iter_all_donors", scan_with_concurrent_write)
+
+    assert donor_stats.reconcile_all(now=NOW) == (1, 1)
+    assert fake_db.data["donor_stats"]["h2"]["frequency_distribution"] == {"5": 1}
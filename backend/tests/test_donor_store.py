@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import donor_store
+import userApi
+
+
+def test_shard_key_rejects_nested_paths():
+    assert donor_store.shard_key(None) == donor_store.UNASSIGNED_HOSPITAL
+    assert donor_store.shard_key("h1") == "h1"
+    with pytest.raises(ValueError):
+        donor_store.shard_key("a/b")
+
+
+def test_insert_donor_writes_record_and_indexes_together(fake_db, sharded):
+    donor_id = donor_store.insert_donor({"cin": "AB123", "hospital_id": "h1"})
+
+    assert fake_db.data["donors"]["h1"][donor_id] == {"cin": "AB123", "hospital_id": "h1"}
+    assert fake_db.data["donor_locations"][donor_id] == "h1"
+    assert fake_db.data["donor_cins"]["AB123"] == {"hospital_id": "h1", "donor_id": donor_id}
+
+
+def test_find_donor_by_cin_uses_global_index(fake_db, sharded):
+    donor_id = donor_store.insert_donor({"cin": "AB123", "hospital_id": "h1"})
+
+    assert donor_store.find_donor_by_cin("AB123") == ("h1", donor_id, {"cin": "AB123", "hospital_id": "h1"})
+    assert donor_store.find_donor_by_cin("ZZ999") == (None, None, None)
+    assert donor_store.find_donor_by_cin("a.b") == (None, None, None)
+
+
+def test_donor_ref_routes_through_donor_locations(fake_db, sharded):
+    donor_id = donor_store.insert_donor({"cin": "AB123", "hospital_id": "h1"})
+
+    assert donor_store.donor_ref(donor_id).get()["cin"] == "AB123"
+    assert donor_store.donor_ref("unknown") is None
+
+
+def test_donor_ref_flat_layout(fake_db):
+    fake_db.data = {"donors": {"d1": {"cin": "AB123"}}}
+
+    assert donor_store.donor_ref("d1").get() == {"cin": "AB123"}
+
+
+def test_iter_all_donors_skips_entries_that_are_not_records(fake_db, sharded):
+    fake_db.data = {"donors": {"h1": {"d1": {"cin": "AB123"}, "a": "scalar"}}}
+
+    assert list(donor_store.iter_all_donors()) == [("h1", "d1", {"cin": "AB123"})]
+
+
+def test_same_cin_at_another_hospital_finds_existing_donor(fake_db, sharded):
+    created = asyncio.run(userApi.add_or_update_donor({"cin": "AB123", "hospital_id": "h1"}))
+    again = asyncio.run(userApi.add_or_update_donor({"cin": "AB123", "hospital_id": "h2"}))
+
+    assert created["status"] == "created"
+    assert again == {
+        "status": "recent",
+        "message": "Donation too recent (< 3 months).",
+        "donor_id": created["donor_id"],
+        "frequence": 1,
+    }
+    assert list(fake_db.data["donors"]) == ["h1"]
+
+
+@pytest.mark.parametrize("payload", [
+    {"cin": "AB.123", "hospital_id": "h1"},
+    {"cin": "AB123", "hospital_id": "a/b"},
+])
+def test_invalid_keys_are_rejected_before_writing(fake_db, sharded, payload):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(userApi.add_or_update_donor(payload))
+
+    assert error.value.status_code == 400
+    assert fake_db.data == {}
+
+
+def test_check_donation_updates_donor_in_its_shard(fake_db, sharded):
+    last_date = (datetime.now() - timedelta(days=100)).strftime("%Y-%m-%d")
+    donor_id = donor_store.insert_donor({
+        "cin": "AB123", "hospital_id": "h1", "frequence": 1,
+        "first_donation_date": last_date, "last_donation_date": last_date,
+    })
+
+    result = asyncio.run(userApi.check_and_update_frequency(donor_id))
+
+    assert result == {"message": "Donation frequency updated", "frequence": 2}
+    assert fake_db.data["donors"]["h1"][donor_id]["frequence"] == 2
@@ -0,0 +1,38 @@
+from migrate_donors import build_updates, is_flat_donor
+
+
+def test_flat_donors_are_moved_and_indexed():
+    donors = {"d1": {"cin": "AB123", "hospital_id": "h1", "frequence": 1}}
+
+    assert build_updates(donors) == [{
+        "donors/h1/d1": donors["d1"],
+        "donors/d1": None,
+        "donor_locations/d1": "h1",
+        "donor_cins/AB123": {"hospital_id": "h1", "donor_id": "d1"},
+    }]
+
+
+def test_donor_without_hospital_goes_to_unassigned_shard():
+    updates = build_updates({"d1": {"name": "x"}})
+
+    assert updates == [{
+        "donors/_unassigned/d1": {"name": "x"},
+        "donors/d1": None,
+        "donor_locations/d1": "_unassigned",
+    }]
+
+
+def test_existing_shards_are_skipped():
+    donors = {"h1": {"d1": {"cin": "AB123"}}, "d2": {"cin": "CD456", "hospital_id": "h1"}}
+
+    assert not is_flat_donor(donors["h1"])
+    assert [list(update)[0] for update in build_updates(donors)] == ["donors/h1/d2"]
+
+
+def test_donors_with_invalid_keys_are_skipped():
+    donors = {
+        "d1": {"cin": "AB123", "hospital_id": "a/b"},
+        "d2": {"cin": "CD.456", "hospital_id": "h1"},
+    }
+
+    assert build_updates(donors) == []
@@ -0,0 +1,149 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import donor_store
+import main
+
+
+NDJSON = {"Accept": "application/x-ndjson"}
+SAMPLE = {"recency": 2, "frequency": 5, "time": 20}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def ndjson_lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+# ------------------------- Firebase paging -------------------------
+
+
+class FakeQuery:
+    def __init__(self, data, calls):
+        self.data = data
+        self.calls = calls
+        self.start = None
+        self.limit = None
+
+    def start_at(self, key):
+        self.start = key
+        return self
+
+    def limit_to_first(self, limit):
+        self.limit = limit
+        return self
+
+    def get(self):
+        self.calls.append((self.start, self.limit))
+        keys = sorted(key for key in self.data if self.start is None or key >= self.start)
+        return {key: self.data[key] for key in keys[:self.limit]}
+
+
+class FakeShard:
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def order_by_key(self):
+        return FakeQuery(self.data, self.calls)
+
+
+def test_iter_hospital_donor_pages_without_duplicates(monkeypatch):
+    shard = FakeShard({key: {"cin": key} for key in "abcde"})
+    monkeypatch.setattr(donor_store, "DONOR_LAYOUT", "sharded")
+    monkeypatch.setattr(donor_store, "donors_ref", lambda hospital_id: shard)
+
+    pages = list(donor_store.iter_hospital_donor_pages("h1", page_size=2))
+
+    assert [[donor_id for donor_id, _ in page] for page in pages] == [["a", "b"], ["c", "d"], ["e"]]
+    # start_at is inclusive, so later pages ask for one extra donor
+    assert shard.calls == [(None, 2), ("b", 3), ("d", 3), ("e", 3)]
+
+
+def test_iter_hospital_donor_pages_empty_shard(monkeypatch):
+    shard = FakeShard({})
+    monkeypatch.setattr(donor_store, "DONOR_LAYOUT", "sharded")
+    monkeypatch.setattr(donor_store, "donors_ref", lambda hospital_id: shard)
+
+    assert list(donor_store.iter_hospital_donor_pages("h1")) == []
+    assert shard.calls == [(None, 500)]
+
+
+# ------------------------- NDJSON responses -------------------------
+
+
+def test_predict_streams_one_prediction_per_line(client, monkeypatch):
+    monkeypatch.setattr(main, "PREDICT_CHUNK_SIZE", 2)
+
+    response = client.post("/predict", json={"samples": [SAMPLE] * 5}, headers=NDJSON)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    expected = client.post("/predict", json={"samples": [SAMPLE] * 5}).json()["predictions"]
+    assert ndjson_lines(response) == [{"prediction": prediction} for prediction in expected]
+
+
+@pytest.mark.parametrize("headers", [{}, NDJSON])
+def test_predict_rejects_empty_batches(client, headers):
+    response = client.post("/predict", json={"samples": []}, headers=headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("headers", [{}, NDJSON])
+def test_predict_model_errors_are_400_before_streaming(client, monkeypatch, headers):
+    def broken_model(data):
+        raise ValueError("model failure")
+    monkeypatch.setattr(main.predictor, "predict", broken_model)
+
+    response = client.post("/predict", json={"samples": [SAMPLE]}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "model failure"}
+
+
+def test_donations_stream_ndjson(client, fake_db, sharded):
+    fake_db.data = {
+        "users_hospital_bank": {"h1": {"nom_hospital": "CHU"}},
+        "donors": {"h1": {f"d{i}": {"cin": f"C{i}", "hospital_id": "h1"} for i in range(5)}},
+    }
+
+    response = client.get("/donations", params={"hospital": "chu"}, headers=NDJSON)
+
+    assert response.status_code == 200
+    assert [line["id"] for line in ndjson_lines(response)] == [f"d{i}" for i in range(5)]
+
+
+# ------------------------- Compression -------------------------
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [("br", "br"), ("gzip", "gzip"), ("br, gzip", "br"), ("identity", None)])
+def test_compression_is_negotiated(client, accept_encoding, expected):
+    response = client.post(
+        "/predict",
+        json={"samples": [SAMPLE] * 500},
+        headers={**NDJSON, "Accept-Encoding": accept_encoding},
+    )
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected
+    assert len(ndjson_lines(response)) == 500
+
+
+def test_ndjson_stream_stays_compressed(client):
+    # A block per model chunk keeps the compressor's window; a message per row would flush it on every line
+    with client.stream(
+        "POST", "/predict",
+        json={"samples": [SAMPLE] * 3000},
+        headers={**NDJSON, "Accept-Encoding": "gzip"},
+    ) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert len(raw) < 2000
+    assert len(gzip.decompress(raw).splitlines()) == 3000
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from firebase_admin import db
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
 import firebase_config  # Firebase setup file
-from datetime import datetime, timedelta
+import donor_store  # Flat or hospital-sharded donor layout
+import donor_stats  # Precomputed per-hospital analytics
+from streaming import ndjson_response, wants_ndjson
+from datetime import datetime
 
 # Initialize FastAPI router for user/donor endpoints
 router = APIRouter()
@@ -24,6 +28,56 @@ class HospitalUser(BaseModel):
     nom_hospital: str
 
 
+# Pydantic model for precomputed hospital donor analytics
+class HospitalStats(BaseModel):
+    """
+    Donor analytics served by /donations/stats.
+    """
+    hospital_id: str
+    donors_total: int
+    eligible_now: int
+    frequency_distribution: Dict[str, int]
+    mean_propensity: Optional[float]
+    propensity_updated_at: Optional[str]
+    updated_at: Optional[str]
+
+
+# ------------------------- Helpers -------------------------
+
+
+def find_hospital_id(hospital):
+    """
+    Resolve a hospital name to its user ID (case-insensitive), or None if not found.
+    """
+    users = db.reference("users_hospital_bank").get()
+    if users:
+        for key, user in users.items():
+            if user.get("nom_hospital", "").lower() == hospital.lower():
+                return key
+    return None
+
+
+def check_hospital_id(donor):
+    """
+    Reject a hospital_id that can't be used as a Firebase key.
+
+    It names the donor's shard and its donor_stats node: a "/" would nest them one level deeper.
+    """
+    hospital_id = donor.get("hospital_id")
+    if hospital_id and not donor_store.is_valid_key(hospital_id):
+        raise HTTPException(status_code=400, detail="Invalid hospital_id.")
+
+
+def update_donor(ref, donor, changes):
+    """
+    Apply `changes` to a donor record and keep the hospital aggregates in sync.
+    """
+    updated = {**donor, **changes}
+    ref.update(changes)
+    donor_stats.record_donor_change(donor.get("hospital_id"), donor, updated)
+    return updated
+
+
 # ------------------------- Routes: Donors (Hospital-Linked Accounts) -------------------------
 
 
@@ -42,7 +96,7 @@ async def add_user(user: HospitalUser):
     ref.child(user.id).set(user.dict())
     return {"status": "success", "id": user.id}
 
-@router.get("/users")
+@router.get("/users", response_model=Dict[str, Any])
 async def get_users():
     """
     Retrieve all hospital-linked donor accounts.
@@ -70,46 +124,68 @@ async def add_donor(donor: dict):
     Returns:
         dict: Firebase-generated donor ID and status.
     """
-    ref = db.reference("donors")
-    new_ref = ref.push(donor)
-    return {"id": new_ref.key, "status": "success"}
-
-@router.get("/donations")
-async def get_donations_by_hospital(hospital: str = Query(...)):
+    # The CIN is a Firebase key in the donor_cins index
+    if donor_store.is_sharded() and donor.get("cin") and not donor_store.is_valid_key(donor["cin"]):
+        raise HTTPException(status_code=400, detail="Invalid CIN.")
+    check_hospital_id(donor)
+
+    hospital_id = donor.get("hospital_id")
+    new_id = donor_store.insert_donor(donor)
+    donor_stats.record_donor_change(hospital_id, new_donor=donor)
+    return {"id": new_id, "status": "success"}
+
+@router.get("/donations", response_model=List[Any])
+async def get_donations_by_hospital(request: Request, hospital: str = Query(...)):
     """
     Retrieve all donor records associated with a specific hospital.
 
+    With "Accept: application/x-ndjson" donors are streamed one per line, a
+    Firebase page at a time, instead of being collected into a single list.
+
     Args:
         hospital (str): Hospital name to match against donor affiliations.
 
     Returns:
         list or tuple: List of matching donors or an error if none found.
     """
-    users_ref = db.reference("users_hospital_bank")
-    users = users_ref.get()
-
-    hospital_id = None
-    if users:
-        for key, user in users.items():
-            if user.get("nom_hospital", "").lower() == hospital.lower():
-                hospital_id = key
-                break
-
+    hospital_id = find_hospital_id(hospital)
     if not hospital_id:
         return {"error": "Hospital not found"}, 404
 
-    donors_ref = db.reference("donors")
-    donors = donors_ref.get()
+    if wants_ndjson(request):
+        return ndjson_response(
+            [{**donor, "id": donor_id} for donor_id, donor in page]
+            for page in donor_store.iter_hospital_donor_pages(hospital_id)
+        )
+
+    donors = donor_store.get_hospital_donors(hospital_id)
 
     filtered_donors = []
-    if donors:
-        for donor_id, donor in donors.items():
-            if donor.get("hospital_id") == hospital_id:
-                donor["id"] = donor_id
-                filtered_donors.append(donor)
+    for donor_id, donor in donors.items():
+        donor["id"] = donor_id
+        filtered_donors.append(donor)
 
     return filtered_donors
 
+@router.get("/donations/stats", response_model=HospitalStats)
+async def get_donation_stats_by_hospital(hospital: str = Query(...)):
+    """
+    Retrieve precomputed donor analytics for a specific hospital.
+
+    Served from aggregates kept up to date on every donor write, so no donor list is scanned.
+
+    Args:
+        hospital (str): Hospital name to match against donor affiliations.
+
+    Returns:
+        dict: Donors total, eligible-now count, frequency distribution and mean propensity.
+    """
+    hospital_id = find_hospital_id(hospital)
+    if not hospital_id:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+
+    return donor_stats.get_hospital_stats(hospital_id)
+
 
 # ------------------------- Route: Add or Update Donor -------------------------
 
@@ -130,34 +206,31 @@ async def add_or_update_donor(donor: dict):
     Returns:
         dict: Operation result and donor metadata.
     """
-    donors_ref = db.reference("donors")
-    donors = donors_ref.get() or {}
-
     cin = donor.get("cin")
     if not cin:
         raise HTTPException(status_code=400, detail="CIN is required.")
+    # The CIN is part of the donor ID and a key in the donor_cins index
+    if not donor_store.is_valid_key(cin):
+        raise HTTPException(status_code=400, detail="Invalid CIN.")
+    check_hospital_id(donor)
 
     now_str = datetime.now().strftime("%Y-%m-%d")
-    existing_donor_id = None
 
     # Find existing donor by CIN
-    for donor_id, d in donors.items():
-        if d.get("cin") == cin:
-            existing_donor_id = donor_id
-            break
+    existing_hospital_id, existing_donor_id, existing_donor = donor_store.find_donor_by_cin(cin)
 
     if existing_donor_id:
-        existing_donor = donors[existing_donor_id]
+        donors_ref = donor_store.donors_ref(existing_hospital_id)
         last_donation_str = existing_donor.get("last_donation_date")
 
         if last_donation_str:
             try:
                 last_donation_date = datetime.strptime(last_donation_str, "%Y-%m-%d")
-                three_months_ago = datetime.now() - timedelta(days=3 * 30)
+                three_months_ago = datetime.now() - donor_stats.DONATION_INTERVAL
 
                 if last_donation_date <= three_months_ago:
                     updated_freq = existing_donor.get("frequence", 0) + 1
-                    donors_ref.child(existing_donor_id).update({
+                    update_donor(donors_ref.child(existing_donor_id), existing_donor, {
                         "frequence": updated_freq,
                         "last_donation_date": now_str
                     })
@@ -179,7 +252,7 @@ async def add_or_update_donor(donor: dict):
 
         else:
             # Donor found but no previous donation recorded
-            donors_ref.child(existing_donor_id).update({
+            update_donor(donors_ref.child(existing_donor_id), existing_donor, {
                 "last_donation_date": now_str,
                 "frequence": 1
             })
@@ -192,14 +265,17 @@ async def add_or_update_donor(donor: dict):
 
     else:
         # Donor doesn't exist: create new
+        hospital_id = donor.get("hospital_id")
+        donors_ref = donor_store.donors_ref(hospital_id)
+        donors = donors_ref.get(shallow=True) or {}
         new_id = f"donor{len(donors)+1}_{cin}"
         donor["id"] = new_id
         donor["frequence"] = 1
         donor["first_donation_date"] = now_str
         donor["last_donation_date"] = now_str
 
-        new_ref = donors_ref.child(new_id)
-        new_ref.set(donor)
+        donor_store.insert_donor(donor, new_id)
+        donor_stats.record_donor_change(hospital_id, new_donor=donor)
 
         return {
             "status": "created",
@@ -209,8 +285,8 @@ async def add_or_update_donor(donor: dict):
 # ------------------------- Route: Check if a donnation too recent (< 3 Months) or not if not then he can donate and we will add one to the frequence(number of donations) -------------------------
 @router.post("/donors/{donor_id}/check-donation")
 async def check_and_update_frequency(donor_id: str):
-    donors_ref = db.reference("donors")
-    donor = donors_ref.child(donor_id).get()
+    donor_ref = donor_store.donor_ref(donor_id)
+    donor = donor_ref.get() if donor_ref else None
 
     if not donor:
         raise HTTPException(status_code=404, detail="Donor not found")
@@ -225,13 +301,12 @@ async def check_and_update_frequency(donor_id: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid donation date format")
 
-    three_months_ago = datetime.now() - timedelta(days=3 * 30)  # Approximation
+    three_months_ago = datetime.now() - donor_stats.DONATION_INTERVAL
     if last_donation_date <= three_months_ago:
         # Update the frequency
         current_freq = donor.get("frequence", 0)
-        donor["frequence"] = current_freq + 1
-        donors_ref.child(donor_id).update({
-            "frequence": donor["frequence"],
+        donor = update_donor(donor_ref, donor, {
+            "frequence": current_freq + 1,
             "last_donation_date": datetime.now().strftime("%Y-%m-%d")  # Optionally update last date
         })
         return {"message": "Donation frequency updated", "frequence": donor["frequence"]}